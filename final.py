@@ -1,21 +1,31 @@
 
 import os
 import sys
-import csv
+import hashlib
+import hmac
 import sqlite3
+import threading
+from html import escape as html_escape
 from datetime import datetime, date, time, timedelta
 from contextlib import contextmanager
 from typing import Optional, Tuple, List, Any
-from PyQt5.QtCore import QSettings, Qt, QDate, QTime, QDateTime
+from PyQt5.QtCore import (
+    QSettings, Qt, QDate, QTime, QDateTime, QTimer, QAbstractTableModel,
+    QModelIndex, QObject, QThread, pyqtSignal, pyqtSlot, QMetaObject,
+    QSignalBlocker
+)
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (
     QApplication, QDialog, QFormLayout, QGridLayout, QHBoxLayout, QLabel,
     QLineEdit, QMainWindow, QMessageBox, QPushButton, QTabWidget, QTableView,
     QToolBar, QVBoxLayout, QWidget, QFileDialog, QComboBox, QDateEdit, QTimeEdit,
-    QSpinBox, QGroupBox, QTextEdit, QHeaderView, QAbstractItemView
+    QSpinBox, QGroupBox, QTextEdit, QHeaderView, QAbstractItemView,
+    QProgressDialog, QStatusBar
+)
+from PyQt5.QtSql import (
+    QSqlDatabase, QSqlTableModel, QSqlQueryModel, QSqlQuery,
+    QSqlRelationalTableModel, QSqlRelation
 )
-from PyQt5.QtSql import QSqlDatabase, QSqlTableModel, QSqlQueryModel, QSqlQuery
-from PyQt5.QtPrintSupport import QPrinter, QPrintPreviewDialog
 from PyQt5.QtWidgets import QAction
 
 # ---------- Constants ----------
@@ -25,51 +35,109 @@ APP_NAME = "Water Supply Manager"
 VERSION = "1.0"
 CONTACT = "priyanshushakya@proton.me"
 
+# About text never changes at runtime, so format it once at import
+_ABOUT_HTML = f"""
+        <h2>{APP_NAME}</h2>
+        <p><strong>Version:</strong> {VERSION}</p>
+        <p><strong>Water Rate:</strong> ₹{int(DEFAULT_RATE)}/hour</p>
+        <p><strong>Contact:</strong> {CONTACT}</p>
+        <hr>
+        """
+
 # ---------- Optional XLSX support ----------
-try:
-    import openpyxl  # type: ignore
-    HAS_XLSX = True
-except ImportError:
-    HAS_XLSX = False
+# Only probe for openpyxl here; actually importing it is deferred to
+# export_rows() so startup doesn't pay its import cost.
+import importlib.util
+HAS_XLSX = importlib.util.find_spec("openpyxl") is not None
 
 # ---------- Database Connection Pool ----------
 class DatabaseManager:
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-    
+    """Shared database access; use the module-level db_manager instance."""
+    __slots__ = ("_connection", "_cursor", "_lock", "_in_transaction")
+
     def __init__(self):
-        if not hasattr(self, 'initialized'):
-            self.initialized = True
-            self._connection = None
-    
+        self._connection = None
+        self._cursor = None
+        # Re-entrant so execute_* helpers can run inside transaction()
+        self._lock = threading.RLock()
+        self._in_transaction = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Lazily open the shared connection (kept alive for the app lifetime)"""
+        if self._connection is None:
+            # A large statement cache means the fixed SQL_TEMPLATES strings are
+            # parsed and planned once, then reused on every subsequent call.
+            self._connection = sqlite3.connect(
+                DB_NAME, check_same_thread=False, cached_statements=256
+            )
+            # One long-lived cursor serves all calls made under the lock
+            self._cursor = self._connection.cursor()
+        return self._connection
+
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(DB_NAME)
-        try:
-            yield conn
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        """Context manager yielding the shared persistent connection"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                yield conn
+                if not self._in_transaction:
+                    conn.commit()
+            except Exception as e:
+                if not self._in_transaction:
+                    conn.rollback()
+                raise e
+
+    @contextmanager
+    def transaction(self):
+        """Group several statements into one BEGIN/COMMIT (a single fsync)"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            self._in_transaction = True
+            try:
+                yield conn
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                self._in_transaction = False
+
+    def close(self):
+        """Close the shared connection (on application shutdown)"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+                self._cursor = None
     
     def execute_query(self, query: str, params: Tuple = ()) -> List[Tuple]:
         """Execute a query and return results"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
+            cursor = self._cursor
             cursor.execute(query, params)
-            conn.commit()
+            # get_connection commits on exit (outside transaction() blocks)
             return cursor.fetchall()
     
     def execute_single(self, query: str, params: Tuple = ()) -> Optional[Tuple]:
         """Execute a query and return single result"""
-        results = self.execute_query(query, params)
-        return results[0] if results else None
+        with self.get_connection() as conn:
+            cursor = self._cursor
+            cursor.execute(query, params)
+            return cursor.fetchone()
+
+    def execute_scalar(self, query: str, params: Tuple = ()) -> Any:
+        """Execute a query and return the first column of the first row"""
+        row = self.execute_single(query, params)
+        return row[0] if row else None
+
+    def execute_insert(self, query: str, params: Tuple = ()) -> int:
+        """Execute an INSERT and return the new row id"""
+        with self.get_connection() as conn:
+            cursor = self._cursor
+            cursor.execute(query, params)
+            return cursor.lastrowid
 
 db_manager = DatabaseManager()
 
@@ -270,8 +338,83 @@ QGroupBox::title {
 }
 """
 
-# These functions will be moved to the MainWindow class
+def _scope_stylesheet(qss: str, theme: str) -> str:
+    """Rewrite a theme's QSS so every rule is scoped to appTheme=<theme>.
+
+    Both themes then coexist in one application stylesheet and switching
+    becomes a property flip plus repolish instead of a full QSS reparse.
+    """
+    scope = f'QWidget[appTheme="{theme}"]'
+    rules = []
+    for block in qss.split('}'):
+        selectors, brace, body = block.partition('{')
+        if not brace or not selectors.strip():
+            continue
+        scoped = []
+        for sel in selectors.split(','):
+            sel = sel.strip()
+            if not sel:
+                continue
+            if sel == 'QWidget':
+                # Style the themed window itself as well as every descendant
+                scoped.append(f'{scope}, {scope} QWidget')
+            else:
+                scoped.append(f'{scope} {sel}')
+        rules.append(', '.join(scoped) + ' {' + body + '}')
+    return '\n'.join(rules)
+
+_combined_stylesheet = (
+    _scope_stylesheet(light_stylesheet, "light")
+    + "\n"
+    + _scope_stylesheet(dark_stylesheet, "dark")
+)
 
+def install_app_stylesheet():
+    """Set the combined two-theme stylesheet; the QSS is parsed only here"""
+    app = QApplication.instance()
+    if app is not None:
+        app.setStyleSheet(_combined_stylesheet)
+
+def apply_app_theme(dark: bool):
+    """Switch themes by stamping appTheme on the top-level windows.
+
+    install_app_stylesheet already holds both themes, so this only flips
+    the dynamic property and repolishes widgets — no stylesheet re-set and
+    no reparse. Stamping is idempotent per window, so calling it for a
+    newly created window is cheap.
+    """
+    app = QApplication.instance()
+    if app is None:
+        return
+    theme = "dark" if dark else "light"
+    for window in app.topLevelWidgets():
+        if window.property("appTheme") == theme:
+            continue
+        window.setProperty("appTheme", theme)
+        style = window.style()
+        style.unpolish(window)
+        style.polish(window)
+        for child in window.findChildren(QWidget):
+            style.unpolish(child)
+            style.polish(child)
+
+
+# ---------- Password hashing ----------
+def _hash_password(password: str, salt: bytes) -> str:
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=16384, r=8, p=1).hex()
+
+def make_password_record(password: str) -> Tuple[str, str]:
+    """Hash a new password, returning (salt_hex, hash_hex) for storage"""
+    salt = os.urandom(16)
+    return salt.hex(), _hash_password(password, salt)
+
+def verify_password(password: str, salt_hex: str, stored_hash: str) -> bool:
+    """Constant-time check of a password against its stored salt + hash"""
+    try:
+        computed = _hash_password(password, bytes.fromhex(salt_hex))
+        return hmac.compare_digest(computed, stored_hash)
+    except (ValueError, TypeError):
+        return False
 
 # ---------- Database bootstrap ----------
 def ensure_database():
@@ -279,18 +422,43 @@ def ensure_database():
     with db_manager.get_connection() as conn:
         c = conn.cursor()
 
+        # Tune the shared connection once at bootstrap: WAL lets readers and
+        # writers proceed concurrently and NORMAL sync avoids an fsync per write.
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        c.execute("PRAGMA temp_store=MEMORY")
+        c.execute("PRAGMA cache_size=-64000")
+        c.execute("PRAGMA mmap_size=268435456")
+        c.execute("PRAGMA foreign_keys=ON")
+
+        # Run the whole bootstrap (DDL + migration) as one transaction so it
+        # costs a single fsync instead of one per statement.
+        c.execute("BEGIN IMMEDIATE")
+
         # Users
         c.execute(
             """
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
+                password TEXT NOT NULL,       -- scrypt hash (hex)
+                salt TEXT,                    -- per-user salt (hex)
                 role TEXT DEFAULT 'admin'
             );
             """
         )
 
+        # Migrate legacy databases: add the salt column and hash any
+        # plaintext passwords in place.
+        c.execute("PRAGMA table_info(users)")
+        user_columns = [col[1] for col in c.fetchall()]
+        if 'salt' not in user_columns:
+            c.execute("ALTER TABLE users ADD COLUMN salt TEXT")
+        c.execute("SELECT id, password FROM users WHERE salt IS NULL OR salt=''")
+        for uid, plain in c.fetchall():
+            salt_hex, pwd_hash = make_password_record(plain or "")
+            c.execute("UPDATE users SET password=?, salt=? WHERE id=?", (pwd_hash, salt_hex, uid))
+
         # Customers (Farmers)
         c.execute(
             """
@@ -329,40 +497,57 @@ def ensure_database():
             columns = [col[1] for col in c.fetchall()]
             if 'rate' in columns:
                 print("Migrating database: Removing rate column...")
-                # Create new table without rate column
-                c.execute("""
-                    CREATE TABLE supplies_new (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        supply_date TEXT NOT NULL,
-                        customer_id INTEGER NOT NULL,
-                        crop TEXT,
-                        start_time TEXT NOT NULL,
-                        end_time TEXT NOT NULL,
-                        hours REAL NOT NULL DEFAULT 0,
-                        amount REAL NOT NULL DEFAULT 0,
-                        notes TEXT,
-                        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY(customer_id) REFERENCES customers(id)
-                    )
-                """)
-                # Copy data without rate column
-                c.execute("""
-                    INSERT INTO supplies_new (id, supply_date, customer_id, crop, start_time, end_time, hours, amount, notes, created_at)
-                    SELECT id, supply_date, customer_id, crop, start_time, end_time, hours, amount, notes, created_at
-                    FROM supplies
-                """)
-                # Drop old table and rename new one
-                c.execute("DROP TABLE supplies")
-                c.execute("ALTER TABLE supplies_new RENAME TO supplies")
+                if sqlite3.sqlite_version_info >= (3, 35, 0):
+                    # One metadata operation instead of a full table rewrite
+                    c.execute("ALTER TABLE supplies DROP COLUMN rate")
+                else:
+                    # Create new table without rate column
+                    c.execute("""
+                        CREATE TABLE supplies_new (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            supply_date TEXT NOT NULL,
+                            customer_id INTEGER NOT NULL,
+                            crop TEXT,
+                            start_time TEXT NOT NULL,
+                            end_time TEXT NOT NULL,
+                            hours REAL NOT NULL DEFAULT 0,
+                            amount REAL NOT NULL DEFAULT 0,
+                            notes TEXT,
+                            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                            FOREIGN KEY(customer_id) REFERENCES customers(id)
+                        )
+                    """)
+                    # Copy data without rate column
+                    c.execute("""
+                        INSERT INTO supplies_new (id, supply_date, customer_id, crop, start_time, end_time, hours, amount, notes, created_at)
+                        SELECT id, supply_date, customer_id, crop, start_time, end_time, hours, amount, notes, created_at
+                        FROM supplies
+                    """)
+                    # Drop old table and rename new one
+                    c.execute("DROP TABLE supplies")
+                    c.execute("ALTER TABLE supplies_new RENAME TO supplies")
                 print("Database migration completed successfully.")
         except Exception as e:
             print(f"Migration warning: {e}")
             # Continue with application startup even if migration fails
 
+        # Indexes for the hot report/billing filters.
+        c.execute("CREATE INDEX IF NOT EXISTS idx_supplies_customer ON supplies(customer_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_supplies_date ON supplies(supply_date)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_supplies_date_cust ON supplies(supply_date, customer_id)")
+        # Billing filters by customer then date range; reports order by
+        # (supply_date, id), so that index also satisfies their sort.
+        c.execute("CREATE INDEX IF NOT EXISTS idx_supplies_cust_date ON supplies(customer_id, supply_date)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_supplies_date_id ON supplies(supply_date, id)")
+
     # Seed admin user if first time
-    count = db_manager.execute_single("SELECT COUNT(*) FROM users;")
-    if count is None:
-        db_manager.execute_query("INSERT INTO users (username, password, role) VALUES (?, ?, ?);", ("admin", "admin", "admin"))
+    count = db_manager.execute_scalar("SELECT COUNT(*) FROM users;")
+    if not count:
+        salt_hex, pwd_hash = make_password_record("admin")
+        db_manager.execute_query(
+            "INSERT INTO users (username, password, salt, role) VALUES (?, ?, ?, ?);",
+            ("admin", pwd_hash, salt_hex, "admin")
+        )
 
     return created
 
@@ -375,26 +560,60 @@ def open_qt_db():
     db.setDatabaseName(DB_NAME)
     if not db.open():
         raise RuntimeError("Failed to open database")
+    # WAL persists in the database file, but synchronous/temp_store/mmap/
+    # cache_size are per-connection, so the Qt connection needs its own
+    # tuning in addition to the sqlite3 one done in ensure_database().
+    try:
+        for pragma in (
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "PRAGMA temp_store=MEMORY",
+            "PRAGMA mmap_size=268435456",
+            "PRAGMA cache_size=-20000",
+        ):
+            QSqlQuery(pragma, db)
+    except Exception:
+        pass  # defaults still work if a pragma is unsupported
     return db
 
 # ---------- Optimized Helpers ----------
+def _to_minutes(time_str: str) -> int:
+    """'HH:MM' or 'hh:MM AM/PM' → minutes past midnight (int)."""
+    t = time_str.strip()
+    h_str, rest = t.split(":", 1)
+    h = int(h_str)
+    m = int(rest[:2])
+    upper = t.upper()
+    if upper.endswith("PM"):
+        if h != 12:
+            h += 12
+    elif upper.endswith("AM"):
+        if h == 12:
+            h = 0
+    return h * 60 + m
+
 def to_hours(start_str: str, end_str: str) -> float:
     """HH:MM or hh:MM AM/PM → hours (float). Handles overnight span."""
     try:
-        if "AM" in start_str.upper() or "PM" in start_str.upper():
-            fmt = "%I:%M %p"
-        else:
-            fmt = "%H:%M"
-        s = datetime.strptime(start_str.strip(), fmt)
-        e = datetime.strptime(end_str.strip(), fmt)
-        if e < s:  # Overnight roll
-            e += timedelta(days=1)
-        delta = e - s
-        return round(delta.total_seconds() / 3600.0, 2)
+        minutes = _to_minutes(end_str) - _to_minutes(start_str)
+        if minutes < 0:  # Overnight roll
+            minutes += 24 * 60
+        return round(minutes / 60.0, 2)
     except Exception as ex:
         print("Time parsing error:", ex)
         return 0.0
 
+def _hours_between_qtimes(t1: QTime, t2: QTime) -> float:
+    """Hours from t1 to t2 as a float, rolling over midnight when t2 is earlier.
+
+    Works straight off QTime.msecsTo so widget callers skip the
+    format-to-string / parse-back round trip that to_hours needs.
+    """
+    ms = t1.msecsTo(t2)
+    if ms < 0:  # Overnight roll
+        ms += 24 * 3600 * 1000
+    return ms / 3_600_000.0
+
 
 def format_currency(amount: float) -> str:
     """Format amount as currency string"""
@@ -403,94 +622,221 @@ def format_currency(amount: float) -> str:
 def validate_time_range(start_time: str, end_time: str) -> bool:
     """Validate that end time is after start time"""
     try:
-        start = datetime.strptime(start_time, "%H:%M")
-        end = datetime.strptime(end_time, "%H:%M")
-        if end < start:
-            end = end.replace(day=end.day + 1)  # Handle overnight
-        return (end - start).total_seconds() > 0
-    except (ValueError, TypeError):
+        minutes = _to_minutes(end_time) - _to_minutes(start_time)
+        if minutes < 0:  # Handle overnight
+            minutes += 24 * 60
+        return minutes > 0
+    except (ValueError, TypeError, AttributeError):
         return False
 
+def _write_csv(headers: List[str], rows: List[List], path: str) -> None:
+    """Write rows as CSV, using a single bulk write when no field needs quoting"""
+    import csv
+    str_rows = [[("" if v is None else str(v)) for v in row] for row in rows]
+    needs_quoting = any(
+        '"' in v or ',' in v or '\n' in v or '\r' in v
+        for row in str_rows for v in row
+    )
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if needs_quoting:
+            w = csv.writer(f)
+            w.writerow(headers)
+            w.writerows(str_rows)
+        else:
+            # Plain data from SQL: join everything and write once
+            lines = [",".join(map(str, headers))]
+            lines.extend(",".join(row) for row in str_rows)
+            f.write("\n".join(lines) + "\n")
+
 def export_rows(headers: List[str], rows: List[List], path: str) -> str:
     """Export data to CSV or Excel format"""
     if path.lower().endswith('.xlsx'):
         if not HAS_XLSX:
             # fallback to csv
             path = os.path.splitext(path)[0] + '.csv'
-            with open(path, 'w', newline='', encoding='utf-8') as f:
-                w = csv.writer(f)
-                w.writerow(headers)
-                w.writerows(rows)
+            _write_csv(headers, rows, path)
             return path
-        wb = openpyxl.Workbook()
-        ws = wb.active
+        import openpyxl  # deferred: heavy import only paid when exporting
+        # write_only streams cells to disk instead of keeping them all in RAM
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
         ws.append(headers)
         for r in rows:
             ws.append(r)
         wb.save(path)
         return path
-    
+
     # CSV
     if not path.lower().endswith('.csv'):
         path += '.csv'
-    with open(path, 'w', newline='', encoding='utf-8') as f:
-        w = csv.writer(f)
-        w.writerow(headers)
-        w.writerows(rows)
+    _write_csv(headers, rows, path)
     return path
 
+class ExportWorker(QObject):
+    """Runs export_rows off the GUI thread and reports back via signals"""
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, headers, rows, path):
+        super().__init__()
+        self._headers = headers
+        self._rows = rows
+        self._path = path
+
+    def run(self):
+        try:
+            self.finished.emit(export_rows(self._headers, self._rows, self._path))
+        except Exception as e:
+            self.error.emit(str(e))
+
+def run_export_in_background(parent, headers, rows, path):
+    """Write an export on a worker thread so the event loop keeps running.
+
+    rows must already be plain Python lists (fetch_query_rows output), so
+    nothing tied to the GUI thread crosses into the worker.
+    """
+    thread = QThread(parent)
+    worker = ExportWorker(headers, rows, path)
+    worker.moveToThread(thread)
+
+    progress = QProgressDialog("Exporting…", None, 0, 0, parent)
+    progress.setWindowModality(Qt.WindowModal)
+    progress.setCancelButton(None)
+    progress.setMinimumDuration(0)
+
+    def done(out):
+        progress.close()
+        thread.quit()
+        QMessageBox.information(parent, "Export", f"Exported to {out}")
+
+    def failed(msg):
+        progress.close()
+        thread.quit()
+        QMessageBox.critical(parent, "Export", f"Export failed: {msg}")
+
+    worker.finished.connect(done)
+    worker.error.connect(failed)
+    thread.started.connect(worker.run)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    # Keep Python-side references alive until the thread winds down
+    parent._export_refs = (thread, worker, progress)
+    thread.start()
+    progress.show()
+
 def safe_html_value(value) -> str:
     """Safely format a value for HTML output"""
     if value is None:
         return ""
     try:
-        # Convert to string and escape HTML characters
-        str_val = str(value).strip()
-        # Basic HTML escaping
-        str_val = str_val.replace("&", "&amp;")
-        str_val = str_val.replace("<", "&lt;")
-        str_val = str_val.replace(">", "&gt;")
-        str_val = str_val.replace('"', "&quot;")
-        return str_val
+        # html.escape handles &<>"' in a single C-level pass
+        return html_escape(str(value).strip(), quote=True)
     except Exception:
         return ""
 
+# Supply dates repeat across many rows, so memoize their display form
+_date_display_cache: dict = {}
+
 def format_date_for_display(date_str: str) -> str:
     """Format date string for better display"""
     if not date_str:
         return ""
+    cached = _date_display_cache.get(date_str)
+    if cached is not None:
+        return cached
     try:
         # If it's already in YYYY-MM-DD format, convert to DD/MM/YYYY
         if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
-            year, month, day = date_str.split('-')
-            return f"{day}/{month}/{year}"
-        return str(date_str)
+            out = f"{date_str[8:10]}/{date_str[5:7]}/{date_str[:4]}"
+        else:
+            out = str(date_str)
     except Exception:
-        return str(date_str)
+        out = str(date_str)
+    _date_display_cache[date_str] = out
+    return out
+
+# Hours values repeat heavily across rows, so memoize the formatted split
+_hours_display_cache: dict = {}
+
+def format_hours_display(hours) -> str:
+    """Render a fractional hours value as 'Xh Ym'"""
+    cached = _hours_display_cache.get(hours)
+    if cached is None:
+        h, m = divmod(int(round(float(hours) * 60)), 60)
+        cached = f"{h}h {m:02d}m"
+        _hours_display_cache[hours] = cached
+    return cached
 
 # ---------- SQL Query Templates ----------
 SQL_TEMPLATES = {
     'customers_select': "SELECT id, name FROM customers ORDER BY name ASC",
+    'customers_rows': "SELECT id, name, village, phone, created_at FROM customers ORDER BY id",
+    'customers_row_by_id': "SELECT id, name, village, phone, created_at FROM customers WHERE id=?",
     'customers_insert': "INSERT INTO customers (name, village, phone) VALUES (?,?,?)",
     'customers_update': "UPDATE customers SET name=?, village=?, phone=? WHERE id=?",
-    'customers_delete': "DELETE FROM customers WHERE id=?",
-    'supplies_insert': """
-        INSERT INTO supplies (supply_date, customer_id, crop, start_time, end_time, hours, amount, notes)
-        VALUES (?,?,?,?,?,?,?,?)
-    """,
-    'supplies_update': """
-        UPDATE supplies SET supply_date=?, customer_id=?, crop=?, start_time=?, end_time=?,
-        hours=?, amount=?, notes=? WHERE id=?
-    """,
-    'supplies_delete': "DELETE FROM supplies WHERE id=?",
-    'supplies_select_base': """
-        SELECT s.id, s.supply_date, c.name as farmer, s.crop, s.start_time, s.end_time,
-        CAST(s.hours AS INTEGER) as h, CAST((s.hours - CAST(s.hours AS INTEGER)) * 60 AS INTEGER) as m,
-        s.amount, s.notes
-    """,
-    'supplies_sum': "SELECT SUM(amount) FROM supplies WHERE customer_id=? AND supply_date BETWEEN ? AND ?"
+    'customers_delete': "DELETE FROM customers WHERE id=?"
 }
 
+class FarmerCache:
+    """Farmer id↔name lookup shared by every tab; use the farmer_cache instance.
+
+    Customers only change through CustomersTab, which calls refresh() after
+    each mutation, so the combos and name lookups hit dicts instead of
+    re-querying the table or scanning combo items.
+    """
+    __slots__ = ("rows", "by_id", "by_name", "_loaded")
+
+    def __init__(self):
+        self.rows: List[Tuple[int, str]] = []
+        self.by_id: dict = {}
+        self.by_name: dict = {}
+        self._loaded = False
+
+    def refresh(self) -> List[Tuple[int, str]]:
+        """Reload the (id, name) list and rebuild both lookup dicts"""
+        rows = db_manager.execute_query(SQL_TEMPLATES['customers_select'])
+        self.rows = rows
+        self.by_id = dict(rows)
+        self.by_name = {name: cid for cid, name in rows}
+        self._loaded = True
+        return rows
+
+    def get_rows(self) -> List[Tuple[int, str]]:
+        if not self._loaded:
+            self.refresh()
+        return self.rows
+
+farmer_cache = FarmerCache()
+
+def fetch_query_rows(sql: str, binds) -> List[List]:
+    """Re-run a query and return its rows as plain Python lists.
+
+    Export and invoice rendering used to walk the view model with
+    model.data(model.index(r, c)) per cell; pulling values straight off a
+    QSqlQuery costs one boundary crossing per row instead.
+    """
+    q = QSqlQuery()
+    # One-pass consumption, so skip the scrollable result cache entirely
+    q.setForwardOnly(True)
+    q.prepare(sql)
+    if isinstance(binds, dict):
+        for name, value in binds.items():
+            q.bindValue(name, value)
+    else:
+        for value in binds:
+            q.addBindValue(value)
+    q.exec_()
+    col_range = range(q.record().count())
+    # Local bindings: attribute lookups cost ~3x a local load and this loop
+    # runs once per row x column
+    value = q.value
+    advance = q.next
+    rows = []
+    append = rows.append
+    while advance():
+        append([value(c) for c in col_range])
+    return rows
+
 # ---------- Login Dialog ----------
 class LoginDialog(QDialog):
     def __init__(self, parent=None):
@@ -559,10 +905,10 @@ class LoginDialog(QDialog):
             
         try:
             user_data = db_manager.execute_single(
-                "SELECT id, role FROM users WHERE username=? AND password=?", 
-                (u, p)
+                "SELECT id, role, salt, password FROM users WHERE username=?",
+                (u,)
             )
-            if user_data:
+            if user_data and verify_password(p, user_data[2] or "", user_data[3] or ""):
                 self.accept()
             else:
                 QMessageBox.warning(self, "Login Failed", "Invalid username or password")
@@ -674,9 +1020,10 @@ class ForgotPasswordDialog(QDialog):
                 return
             
             # Update password
+            salt_hex, pwd_hash = make_password_record(new_pwd)
             db_manager.execute_query(
-                "UPDATE users SET password=? WHERE username=?", 
-                (new_pwd, username)
+                "UPDATE users SET password=?, salt=? WHERE username=?",
+                (pwd_hash, salt_hex, username)
             )
             
             QMessageBox.information(self, "Success", "Password reset successfully!")
@@ -786,9 +1133,10 @@ class CreateUserDialog(QDialog):
                 return
             
             # Create new user
+            salt_hex, pwd_hash = make_password_record(password)
             db_manager.execute_query(
-                "INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
-                (username, password, role)
+                "INSERT INTO users (username, password, salt, role) VALUES (?, ?, ?, ?)",
+                (username, pwd_hash, salt_hex, role)
             )
             
             QMessageBox.information(self, "Success", f"User '{username}' created successfully!")
@@ -797,6 +1145,56 @@ class CreateUserDialog(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to create user: {str(e)}")
 
+# ---------- Customers Model ----------
+class CustomersModel(QAbstractTableModel):
+    """In-memory customers model updated row-by-row instead of re-selecting"""
+    HEADERS = ["ID", "Name", "Village", "Phone", "Created"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[Tuple] = []
+
+    def load(self):
+        """Reload the full customer list from the database"""
+        self.beginResetModel()
+        self._rows = db_manager.execute_query(SQL_TEMPLATES['customers_rows'])
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self._rows[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def row(self, r: int) -> Tuple:
+        """Direct tuple access, cheaper than data() per cell"""
+        return self._rows[r]
+
+    def append_row(self, row: Tuple):
+        pos = len(self._rows)
+        self.beginInsertRows(QModelIndex(), pos, pos)
+        self._rows.append(row)
+        self.endInsertRows()
+
+    def update_row(self, r: int, row: Tuple):
+        self._rows[r] = row
+        self.dataChanged.emit(self.index(r, 0), self.index(r, len(self.HEADERS) - 1))
+
+    def remove_row(self, r: int):
+        self.beginRemoveRows(QModelIndex(), r, r)
+        del self._rows[r]
+        self.endRemoveRows()
+
 # ---------- Customers Tab ----------
 class CustomersTab(QWidget):
     def __init__(self, parent=None):
@@ -852,17 +1250,9 @@ class CustomersTab(QWidget):
 
 
     def setup_model(self):
-        """Setup the table model"""
-        self.model = QSqlTableModel(self)
-        self.model.setTable("customers")
-        self.model.setEditStrategy(QSqlTableModel.OnFieldChange)
-        self.model.select()
-        
-        # Set headers
-        headers = ["ID", "Name", "Village", "Phone", "Created"]
-        for i, header in enumerate(headers):
-            self.model.setHeaderData(i, Qt.Horizontal, header)
-        
+        """Setup the table model (read-only; updated incrementally on mutation)"""
+        self.model = CustomersModel(self)
+        self.model.load()
         self.view.setModel(self.model)
 
     def connect_signals(self):
@@ -893,8 +1283,12 @@ class CustomersTab(QWidget):
         phone = self.txt_phone.text().strip()
         
         try:
-            db_manager.execute_query(SQL_TEMPLATES['customers_insert'], (name, village, phone))
-            self.model.select()
+            with db_manager.transaction():
+                new_id = db_manager.execute_insert(SQL_TEMPLATES['customers_insert'], (name, village, phone))
+                row = db_manager.execute_single(SQL_TEMPLATES['customers_row_by_id'], (new_id,))
+            if row:
+                self.model.append_row(row)
+            farmer_cache.refresh()
             self.clear_form()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to add customer: {str(e)}")
@@ -915,9 +1309,14 @@ class CustomersTab(QWidget):
         village = self.txt_village.text().strip()
         phone = self.txt_phone.text().strip()
         
+        r = self.view.currentIndex().row()
         try:
-            db_manager.execute_query(SQL_TEMPLATES['customers_update'], (name, village, phone, pk))
-            self.model.select()
+            with db_manager.transaction():
+                db_manager.execute_query(SQL_TEMPLATES['customers_update'], (name, village, phone, pk))
+                row = db_manager.execute_single(SQL_TEMPLATES['customers_row_by_id'], (pk,))
+            if row:
+                self.model.update_row(r, row)
+            farmer_cache.refresh()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to update customer: {str(e)}")
 
@@ -933,9 +1332,11 @@ class CustomersTab(QWidget):
         )
         
         if reply == QMessageBox.Yes:
+            r = self.view.currentIndex().row()
             try:
                 db_manager.execute_query(SQL_TEMPLATES['customers_delete'], (pk,))
-                self.model.select()
+                self.model.remove_row(r)
+                farmer_cache.refresh()
                 self.clear_form()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to delete customer: {str(e)}")
@@ -953,11 +1354,40 @@ class CustomersTab(QWidget):
         idx = self.view.currentIndex()
         if not idx.isValid():
             return
-            
-        r = idx.row()
-        self.txt_name.setText(str(self.model.data(self.model.index(r, 1)) or ""))
-        self.txt_village.setText(str(self.model.data(self.model.index(r, 2)) or ""))
-        self.txt_phone.setText(str(self.model.data(self.model.index(r, 3)) or ""))
+
+        _, name, village, phone, _ = self.model.row(idx.row())
+        self.txt_name.setText(str(name or ""))
+        self.txt_village.setText(str(village or ""))
+        self.txt_phone.setText(str(phone or ""))
+
+# ---------- Supplies Model ----------
+class SupplyTableModel(QSqlRelationalTableModel):
+    """Editable supplies model that renders the raw hours REAL as 'Xh Ym'.
+
+    The hours/minutes split used to be computed with CAST arithmetic per
+    row inside the SELECT; splitting here keeps SQLite to a plain column
+    scan and reuses the memoized formatted string per distinct value.
+    """
+    hours_column = 6
+
+    def data(self, index, role=Qt.DisplayRole):
+        value = super().data(index, role)
+        if role == Qt.DisplayRole and index.column() == self.hours_column and value is not None:
+            return format_hours_display(value)
+        return value
+
+class HoursQueryModel(QSqlQueryModel):
+    """Read-only query model that renders one raw hours REAL column as 'Xh Ym'"""
+
+    def __init__(self, hours_column, parent=None):
+        super().__init__(parent)
+        self.hours_column = hours_column
+
+    def data(self, index, role=Qt.DisplayRole):
+        value = super().data(index, role)
+        if role == Qt.DisplayRole and index.column() == self.hours_column and value is not None:
+            return format_hours_display(value)
+        return value
 
 # ---------- Water Supply Tab ----------
 class SupplyTab(QWidget):
@@ -990,9 +1420,14 @@ class SupplyTab(QWidget):
         self.t_start.setDisplayFormat("HH:mm")
         self.t_end.setDisplayFormat("HH:mm")
 
-        # Auto calculate when time changes
-        self.t_start.timeChanged.connect(self.auto_calc)
-        self.t_end.timeChanged.connect(self.auto_calc)
+        # Auto calculate when time changes, debounced so spinner autorepeat
+        # triggers at most one recompute per pause
+        self._calc_timer = QTimer(self)
+        self._calc_timer.setSingleShot(True)
+        self._calc_timer.setInterval(80)
+        self._calc_timer.timeout.connect(self.auto_calc)
+        self.t_start.timeChanged.connect(self._schedule_auto_calc)
+        self.t_end.timeChanged.connect(self._schedule_auto_calc)
 
         for lbl, w in (
             ("Date", self.dt), ("Farmer", self.cmb_farmer), ("Crop", self.txt_crop),
@@ -1019,10 +1454,17 @@ class SupplyTab(QWidget):
         for b in (btn_calc, btn_add, btn_upd, btn_del, btn_clear):
             btns.addWidget(b)
 
-        # Table (Query model with join to show farmer name)
-        self.model = QSqlQueryModel(self)
+        # Table (relational model so the farmer name comes from the customers
+        # join while CRUD applies row-by-row via submitAll instead of
+        # re-running the full query after every click)
+        self.model = SupplyTableModel(self)
+        self.model.setTable('supplies')
+        self.model.setRelation(2, QSqlRelation('customers', 'id', 'name'))
+        self.model.setEditStrategy(QSqlTableModel.OnManualSubmit)
+        self.model.setSort(1, Qt.DescendingOrder)
         self.view = QTableView()
         self.view.setModel(self.model)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.view.setSelectionMode(QAbstractItemView.SingleSelection)
         self.view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
@@ -1036,33 +1478,48 @@ class SupplyTab(QWidget):
         # Selection → form sync
         self.view.selectionModel().selectionChanged.connect(self.sync_form)
 
+    @pyqtSlot()
     def reload_customers(self):
-        self.cmb_farmer.clear()
-        q = QSqlQuery("SELECT id, name FROM customers ORDER BY name ASC")
-        while q.next():
-            self.cmb_farmer.addItem(q.value(1), q.value(0))
-
-    def base_select_query(self):
-        return (
-            "SELECT s.id, s.supply_date, c.name as farmer, s.crop, s.start_time, s.end_time,"
-            "CAST(s.hours AS INTEGER) as h, CAST((s.hours - CAST(s.hours AS INTEGER)) * 60 AS INTEGER) as m,"
-            "s.amount, s.notes"
-        )
+        self.setUpdatesEnabled(False)
+        try:
+            self.set_customers(farmer_cache.get_rows())
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def set_customers(self, rows):
+        """Populate the farmer combo from an already-fetched (id, name) list"""
+        cmb = self.cmb_farmer
+        # One addItems call instead of per-row addItem, with signals blocked
+        # so currentIndexChanged doesn't fan out N times during the rebuild
+        cmb.blockSignals(True)
+        cmb.clear()
+        cmb.addItems([name for _, name in rows])
+        # Combo row per customer id, so sync_form seats the selection with one
+        # dict lookup instead of a linear findData/findText scan
+        self._farmer_row_by_id = {}
+        for i, (cid, _) in enumerate(rows):
+            cmb.setItemData(i, cid)
+            self._farmer_row_by_id[cid] = i
+        cmb.blockSignals(False)
 
     def refresh_table(self):
-        sql = self.base_select_query() + " FROM supplies s JOIN customers c ON s.customer_id=c.id ORDER BY s.supply_date DESC, s.id DESC"
-        self.model.setQuery(sql)
-        headers = ["ID", "Date", "Farmer", "Crop", "Start", "Off", "Hours", "Minutes", "Amount", "Notes"]
+        self.model.select()
+        headers = ["ID", "Date", "Farmer", "Crop", "Start", "Off", "Hours", "Amount", "Notes"]
         for i, h in enumerate(headers):
             self.model.setHeaderData(i, Qt.Horizontal, h)
+        # The table model pulls every physical column; keep created_at out
+        # of the view like the old explicit SELECT did
+        self.view.setColumnHidden(9, True)
+
+    def _schedule_auto_calc(self, _time=None):
+        """Restart the debounce window on every time edit"""
+        self._calc_timer.start()
 
     def auto_calc(self):
-        st = self.t_start.time().toString("HH:mm")
-        et = self.t_end.time().toString("HH:mm")
-        hrs = to_hours(st, et)
+        hrs = _hours_between_qtimes(self.t_start.time(), self.t_end.time())
         self.txt_hours.setText(f"{hrs:.2f}")
-        rate = DEFAULT_RATE  # Fixed rate
-        amt = round(hrs * rate, 2)
+        # The :.2f format already rounds for display
+        amt = hrs * DEFAULT_RATE
         self.txt_amount.setText(f"{amt:.2f}")
 
     def clear_form(self):
@@ -1119,12 +1576,17 @@ class SupplyTab(QWidget):
             QMessageBox.warning(self, "Validation", "Please add/select a Farmer in Customers tab")
             return
             
-        try:
-            db_manager.execute_query(SQL_TEMPLATES['supplies_insert'], (d, cid, crop, st, et, hrs, amt, notes))
-            self.refresh_table()
+        model = self.model
+        row = model.rowCount()
+        model.insertRow(row)
+        for col, value in enumerate((d, cid, crop, st, et, hrs, amt, notes), start=1):
+            model.setData(model.index(row, col), value)
+        if model.submitAll():
             self.clear_form()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to add record: {str(e)}")
+        else:
+            err = model.lastError().text()
+            model.revertAll()
+            QMessageBox.critical(self, "Error", f"Failed to add record: {err}")
 
     def update_record(self):
         """Update selected supply record"""
@@ -1138,12 +1600,15 @@ class SupplyTab(QWidget):
             return
             
         d, cid, crop, st, et, hrs, amt, notes = values
-        
-        try:
-            db_manager.execute_query(SQL_TEMPLATES['supplies_update'], (d, cid, crop, st, et, hrs, amt, notes, pk))
-            self.refresh_table()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to update record: {str(e)}")
+
+        r = self.view.currentIndex().row()
+        model = self.model
+        for col, value in enumerate((d, cid, crop, st, et, hrs, amt, notes), start=1):
+            model.setData(model.index(r, col), value)
+        if not model.submitAll():
+            err = model.lastError().text()
+            model.revertAll()
+            QMessageBox.critical(self, "Error", f"Failed to update record: {err}")
 
     def delete_record(self):
         """Delete selected supply record"""
@@ -1157,38 +1622,41 @@ class SupplyTab(QWidget):
         )
         
         if reply == QMessageBox.Yes:
-            try:
-                db_manager.execute_query(SQL_TEMPLATES['supplies_delete'], (pk,))
-                self.refresh_table()
+            r = self.view.currentIndex().row()
+            if self.model.removeRow(r) and self.model.submitAll():
                 self.clear_form()
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to delete record: {str(e)}")
+            else:
+                err = self.model.lastError().text()
+                self.model.revertAll()
+                QMessageBox.critical(self, "Error", f"Failed to delete record: {err}")
 
     def sync_form(self):
         idx = self.view.currentIndex()
         if not idx.isValid(): return
-        r = idx.row()
-        
-        d = self.model.data(self.model.index(r,1)); self.dt.setDate(QDate.fromString(d, 'yyyy-MM-dd'))
-        farmer_name = self.model.data(self.model.index(r,2))
-        # set combo by text
-        i = self.cmb_farmer.findText(str(farmer_name))
-        if i >= 0: self.cmb_farmer.setCurrentIndex(i)
-        self.txt_crop.setText(str(self.model.data(self.model.index(r,3)) or ""))
-        self.t_start.setTime(QTime.fromString(self.model.data(self.model.index(r,4)), 'HH:mm'))
-        self.t_end.setTime(QTime.fromString(self.model.data(self.model.index(r,5)), 'HH:mm'))
-        # Combine hours and minutes for display
-        hours = self.model.data(self.model.index(r,6)) or 0
-        minutes = self.model.data(self.model.index(r,7)) or 0
-        total_hours = float(hours) + float(minutes) / 60.0
-        self.txt_hours.setText(f"{total_hours:.2f}")
-        self.txt_amount.setText(str(self.model.data(self.model.index(r,8)) or ""))
-        self.txt_notes.setText(str(self.model.data(self.model.index(r,9)) or ""))
+        # One QSqlRecord fetch replaces a model.data/model.index pair per field
+        rec = self.model.record(idx.row())
+        time_from_string = QTime.fromString
+
+        self.dt.setDate(QDate.fromString(rec.value("supply_date"), 'yyyy-MM-dd'))
+        # Resolve the farmer via the shared cache (the relation exposes the
+        # customers.name column), then seat the combo through the row map
+        cid = farmer_cache.by_name.get(rec.value("name"))
+        if cid is not None:
+            self.cmb_farmer.setCurrentIndex(self._farmer_row_by_id.get(cid, 0))
+        self.txt_crop.setText(str(rec.value("crop") or ""))
+        self.t_start.setTime(time_from_string(rec.value("start_time"), 'HH:mm'))
+        self.t_end.setTime(time_from_string(rec.value("end_time"), 'HH:mm'))
+        hours = rec.value("hours") or 0
+        self.txt_hours.setText(f"{float(hours):.2f}")
+        self.txt_amount.setText(str(rec.value("amount") or ""))
+        self.txt_notes.setText(str(rec.value("notes") or ""))
 
 # ---------- Reports Tab ----------
 class ReportsTab(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._last_sql = None
+        self._last_binds = {}
         self.build_ui()
         self.reload_customers()
         self.run_query()
@@ -1219,7 +1687,7 @@ class ReportsTab(QWidget):
         grid.addWidget(btn_export, 2, 3)
         filters.setLayout(grid)
 
-        self.model = QSqlQueryModel(self)
+        self.model = HoursQueryModel(6, self)
         self.view = QTableView()
         self.view.setModel(self.model)
         self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
@@ -1235,228 +1703,84 @@ class ReportsTab(QWidget):
         btn_apply.clicked.connect(self.run_query)
         btn_export.clicked.connect(self.export_data)
 
+    @pyqtSlot()
     def reload_customers(self):
-        self.cmb_farmer.clear()
-        self.cmb_farmer.addItem("(All)", None)
-        q = QSqlQuery("SELECT id, name FROM customers ORDER BY name ASC")
-        while q.next():
-            self.cmb_farmer.addItem(q.value(1), q.value(0))
-
-    def build_sql(self):
+        self.setUpdatesEnabled(False)
+        try:
+            self.set_customers(farmer_cache.get_rows())
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def set_customers(self, rows):
+        """Populate the farmer filter from an already-fetched (id, name) list"""
+        cmb = self.cmb_farmer
+        cmb.blockSignals(True)
+        cmb.clear()
+        cmb.addItems(["(All)"] + [name for _, name in rows])
+        cmb.setItemData(0, None)
+        for i, (cid, _) in enumerate(rows, start=1):
+            cmb.setItemData(i, cid)
+        cmb.blockSignals(False)
+
+    def build_sql(self, cid, crop):
         conds = ["s.supply_date BETWEEN :d1 AND :d2"]
-        if self.cmb_farmer.currentData() is not None:
+        if cid is not None:
             conds.append("s.customer_id = :cid")
-        crop = self.txt_crop.text().strip()
         if crop:
             conds.append("s.crop LIKE :crop")
         where = " AND ".join(conds)
         sql = (
             "SELECT s.id, s.supply_date, c.name as farmer, s.crop, s.start_time, s.end_time, "
-            "CAST(s.hours AS INTEGER) as h, CAST((s.hours - CAST(s.hours AS INTEGER)) * 60 AS INTEGER) as m, "
-            "s.amount, s.notes "
+            "s.hours, s.amount, s.notes, "
+            "SUM(s.amount) OVER () AS grand_total "
             f"FROM supplies s JOIN customers c ON s.customer_id=c.id WHERE {where} "
             "ORDER BY s.supply_date ASC, s.id ASC"
         )
         return sql
 
     def run_query(self):
-        sql = self.build_sql()
-        q = QSqlQuery()
-        q.prepare(sql)
-        q.bindValue(":d1", self.d_from.date().toString('yyyy-MM-dd'))
-        q.bindValue(":d2", self.d_to.date().toString('yyyy-MM-dd'))
-        if self.cmb_farmer.currentData() is not None:
-            q.bindValue(":cid", self.cmb_farmer.currentData())
+        # Read every filter widget exactly once per run
+        d1 = self.d_from.date().toString('yyyy-MM-dd')
+        d2 = self.d_to.date().toString('yyyy-MM-dd')
+        cid = self.cmb_farmer.currentData()
         crop = self.txt_crop.text().strip()
-        if crop:
-            q.bindValue(":crop", f"%{crop}%")
-        q.exec_()
-        self.model.setQuery(q)
-        headers = ["ID", "Date", "Farmer", "Crop", "Start", "Off", "Hours", "Minutes", "Amount", "Notes"]
-        for i, h in enumerate(headers):
-            self.model.setHeaderData(i, Qt.Horizontal, h)
-        # total
-        tot_sql = self.build_sql().replace("SELECT s.id, s.supply_date, c.name as farmer, s.crop, s.start_time, s.end_time, CAST(s.hours AS INTEGER) as h, CAST((s.hours - CAST(s.hours AS INTEGER)) * 60 AS INTEGER) as m, s.amount, s.notes", "SELECT SUM(s.amount)")
-        tot_q = QSqlQuery()
-        tot_q.prepare(tot_sql)
-        tot_q.bindValue(":d1", self.d_from.date().toString('yyyy-MM-dd'))
-        tot_q.bindValue(":d2", self.d_to.date().toString('yyyy-MM-dd'))
-        if self.cmb_farmer.currentData() is not None:
-            tot_q.bindValue(":cid", self.cmb_farmer.currentData())
-        if crop:
-            tot_q.bindValue(":crop", f"%{crop}%")
-        tot_q.exec_()
-        if tot_q.next():
-            total = tot_q.value(0) or 0
-            self.lbl_total.setText(f"Total Amount: ₹{float(total):.2f}")
-
-    def export_data(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Export Report", f"report_{QDateTime.currentDateTime().toString('yyyyMMdd_HHmm')}", "CSV (*.csv);;Excel (*.xlsx)")
-        if not path:
-            return
-        headers = [self.model.headerData(i, Qt.Horizontal) for i in range(self.model.columnCount())]
-        rows = []
-        for r in range(self.model.rowCount()):
-            rows.append([self.model.data(self.model.index(r, c)) for c in range(self.model.columnCount())])
-        out = export_rows(headers, rows, path)
-        QMessageBox.information(self, "Export",f"Exported to{out}")
-
-# ---------- Billing ----------
-class BillingTab(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.build_ui()
-        self.reload_customers()
-        self.load_data()
 
-    def build_ui(self):
-        filt = QGroupBox("Invoice Range")
-        g = QGridLayout()
-        self.cmb_farmer = QComboBox()
-        self.d_from = QDateEdit()
-        self.d_from.setCalendarPopup(True)
-        self.d_to = QDateEdit()
-        self.d_to.setCalendarPopup(True)
-        today = QDate.currentDate()
-        self.d_from.setDate(today.addDays(-7))
-        self.d_to.setDate(today)
-        btn_load = QPushButton("Load")
-        btn_print = QPushButton("Print Invoice…")
-        btn_export = QPushButton("Export…")
-        g.addWidget(QLabel("Farmer"), 0, 0)
-        g.addWidget(self.cmb_farmer, 0, 1)
-        g.addWidget(QLabel("From"), 1, 0)
-        g.addWidget(self.d_from, 1, 1)
-        g.addWidget(QLabel("To"), 1, 2)
-        g.addWidget(self.d_to, 1, 3)
-        g.addWidget(btn_load, 2, 2)
-        g.addWidget(btn_export, 2, 3)
-        g.addWidget(btn_print, 2, 4)
-        filt.setLayout(g)
-
-        self.model = QSqlQueryModel(self)
-        self.view = QTableView()
-        self.view.setModel(self.model)
-        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.lbl_total = QLabel("Total Amount: ₹0.00")
-
-        lay = QVBoxLayout(self)
-        lay.addWidget(filt)
-        lay.addWidget(self.view)
-        lay.addWidget(self.lbl_total)
-
-        btn_load.clicked.connect(self.load_data)
-        btn_export.clicked.connect(self.export)
-        btn_print.clicked.connect(self.print_invoice_simple)
-
-    def reload_customers(self):
-        self.cmb_farmer.clear()
-        q = QSqlQuery("SELECT id, name FROM customers ORDER BY name ASC")
-        while q.next():
-            self.cmb_farmer.addItem(q.value(1), q.value(0))
+        binds = {":d1": d1, ":d2": d2}
+        if cid is not None:
+            binds[":cid"] = cid
+        if crop:
+            binds[":crop"] = f"%{crop}%"
 
-    def load_data(self):
-        cid = self.cmb_farmer.currentData()
-        if cid is None:
-            return
-        d1 = self.d_from.date().toString('yyyy-MM-dd')
-        d2 = self.d_to.date().toString('yyyy-MM-dd')
-        sql = (
-            "SELECT s.supply_date, s.crop, s.start_time, s.end_time, "
-            "CAST(s.hours AS INTEGER) as h, CAST((s.hours - CAST(s.hours AS INTEGER)) * 60 AS INTEGER) as m, "
-            "s.amount, s.notes "
-            "FROM supplies s WHERE s.customer_id=? AND s.supply_date BETWEEN ? AND ? "
-            "ORDER BY s.supply_date ASC, s.id ASC"
-        )
+        sql = self.build_sql(cid, crop)
         q = QSqlQuery()
         q.prepare(sql)
-        q.addBindValue(cid)
-        q.addBindValue(d1)
-        q.addBindValue(d2)
+        for name, value in binds.items():
+            q.bindValue(name, value)
         q.exec_()
         self.model.setQuery(q)
-        headers = ["Date", "Crop", "Start", "Off", "Hours", "Minutes", "Amount", "Notes"]
+        self._last_sql = sql
+        self._last_binds = binds
+        headers = ["ID", "Date", "Farmer", "Crop", "Start", "Off", "Hours", "Amount", "Notes"]
         for i, h in enumerate(headers):
             self.model.setHeaderData(i, Qt.Horizontal, h)
-        # total
-        qsum = QSqlQuery("SELECT SUM(amount) FROM supplies WHERE customer_id=? AND supply_date BETWEEN ? AND ?")
-        qsum.addBindValue(cid)
-        qsum.addBindValue(d1)
-        qsum.addBindValue(d2)
-        qsum.exec_()
-        total = 0.0
-        if qsum.next():
-            total = qsum.value(0) or 0.0
-        self.lbl_total.setText(f"Total Amount: ₹{float(total):.2f}")
-        
-        # Update button states
-        self.update_button_states()
+        # Grand total rides along as a hidden window-function column, so no
+        # second SUM query is needed
+        self.view.setColumnHidden(9, True)
+        total = self.model.record(0).value('grand_total') if self.model.rowCount() else 0
+        self.lbl_total.setText(f"Total Amount: ₹{float(total or 0):.2f}")
 
-    def export(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Export Invoice Data", f"invoice_{QDateTime.currentDateTime().toString('yyyyMMdd_HHmm')}", "CSV (*.csv);;Excel (*.xlsx)")
+    def export_data(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Report", f"report_{QDateTime.currentDateTime().toString('yyyyMMdd_HHmm')}", "CSV (*.csv);;Excel (*.xlsx)")
         if not path:
             return
-        headers = [self.model.headerData(i, Qt.Horizontal) for i in range(self.model.columnCount())]
-        rows = []
-        for r in range(self.model.rowCount()):
-            rows.append([self.model.data(self.model.index(r, c)) for c in range(self.model.columnCount())])
-        out = export_rows(headers, rows, path)
-        QMessageBox.information(self, "Export", f"Exported to{out}")
-
-    def invoice_html(self):
-        """Generate HTML for invoice printing"""
-        farmer = self.cmb_farmer.currentText()
-        d1 = self.d_from.date().toString('yyyy-MM-dd')
-        d2 = self.d_to.date().toString('yyyy-MM-dd')
-        
-        rows_html = ""
-        total = 0.0
-        
-        # Check if we have data
-        if self.model.rowCount() == 0:
-            rows_html = """
-                <tr>
-                    <td colspan="8" style="text-align: center; padding: 20px; color: #666;">
-                        No records found for the selected period
-                    </td>
-                </tr>
-            """
-        else:
-            for r in range(self.model.rowCount()):
-                vals = [self.model.data(self.model.index(r,c)) for c in range(self.model.columnCount())]
-                if len(vals) >= 8:
-                    dt, crop, st, et, hrs, mins, amt, notes = vals
-                    
-                    # Format data properly
-                    dt_str = format_date_for_display(dt)
-                    crop_str = safe_html_value(crop)
-                    st_str = safe_html_value(st)
-                    et_str = safe_html_value(et)
-                    hrs_str = safe_html_value(hrs) if hrs is not None else "0"
-                    mins_str = safe_html_value(mins) if mins is not None else "0"
-                    amt_str = safe_html_value(amt) if amt else "0"
-                    notes_str = safe_html_value(notes)
-                    
-                    # Calculate total
-                    try:
-                        total += float(amt or 0)
-                    except (ValueError, TypeError):
-                        pass
-                    
-                    rows_html += f"""
-                        <tr>
-                            <td>{dt_str}</td>
-                            <td>{crop_str}</td>
-                            <td>{st_str}</td>
-                            <td>{et_str}</td>
-                            <td>{hrs_str}</td>
-                            <td>{mins_str}</td>
-                            <td>{format_currency(float(amt or 0))}</td>
-                            <td>{notes_str}</td>
-                        </tr>
-                    """
-        
-        html = f"""
+        # Exclude the hidden grand_total column from the export
+        cc = self.model.columnCount() - 1
+        headers = [self.model.headerData(i, Qt.Horizontal) for i in range(cc)]
+        rows = fetch_query_rows(self._last_sql, self._last_binds) if self._last_sql else []
+        run_export_in_background(self, headers, [row[:cc] for row in rows], path)
+
+# Invoice shell: built once at import; rows and totals are formatted in.
+_INVOICE_TEMPLATE = """
         <!DOCTYPE html>
         <html>
         <head>
@@ -1527,7 +1851,7 @@ class BillingTab(QWidget):
             <div class="info">
                 <div><strong>Farmer:</strong> {farmer}</div>
                 <div><strong>Period:</strong> {d1} to {d2}</div>
-                <div><strong>Rate:</strong> ₹{int(DEFAULT_RATE)}/hour</div>
+                <div><strong>Rate:</strong> ₹{rate}/hour</div>
             </div>
             
             <table>
@@ -1549,7 +1873,7 @@ class BillingTab(QWidget):
                 <tfoot>
                     <tr class="total-row">
                         <td colspan="6"><strong>Total Amount</strong></td>
-                        <td colspan="2" class="amount"><strong>{format_currency(total)}</strong></td>
+                        <td colspan="2" class="amount"><strong>{total}</strong></td>
                     </tr>
                 </tfoot>
             </table>
@@ -1561,6 +1885,184 @@ class BillingTab(QWidget):
         </body>
         </html>
         """
+
+# ---------- Billing ----------
+class BillingTab(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._last_sql = None
+        self._last_binds = []
+        self._doc = None
+        self.build_ui()
+        self.reload_customers()
+        self.load_data()
+
+    def build_ui(self):
+        filt = QGroupBox("Invoice Range")
+        g = QGridLayout()
+        self.cmb_farmer = QComboBox()
+        self.d_from = QDateEdit()
+        self.d_from.setCalendarPopup(True)
+        self.d_to = QDateEdit()
+        self.d_to.setCalendarPopup(True)
+        today = QDate.currentDate()
+        self.d_from.setDate(today.addDays(-7))
+        self.d_to.setDate(today)
+        btn_load = QPushButton("Load")
+        # Kept as attributes so update_button_states can flip them directly
+        self.btn_print = btn_print = QPushButton("Print Invoice…")
+        self.btn_export = btn_export = QPushButton("Export…")
+        g.addWidget(QLabel("Farmer"), 0, 0)
+        g.addWidget(self.cmb_farmer, 0, 1)
+        g.addWidget(QLabel("From"), 1, 0)
+        g.addWidget(self.d_from, 1, 1)
+        g.addWidget(QLabel("To"), 1, 2)
+        g.addWidget(self.d_to, 1, 3)
+        g.addWidget(btn_load, 2, 2)
+        g.addWidget(btn_export, 2, 3)
+        g.addWidget(btn_print, 2, 4)
+        filt.setLayout(g)
+
+        self.model = HoursQueryModel(4, self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.lbl_total = QLabel("Total Amount: ₹0.00")
+
+        lay = QVBoxLayout(self)
+        lay.addWidget(filt)
+        lay.addWidget(self.view)
+        lay.addWidget(self.lbl_total)
+
+        btn_load.clicked.connect(self.load_data)
+        btn_export.clicked.connect(self.export)
+        btn_print.clicked.connect(self.print_invoice_simple)
+
+    @pyqtSlot()
+    def reload_customers(self):
+        self.setUpdatesEnabled(False)
+        try:
+            self.set_customers(farmer_cache.get_rows())
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def set_customers(self, rows):
+        """Populate the farmer combo from an already-fetched (id, name) list"""
+        cmb = self.cmb_farmer
+        # One addItems call instead of per-row addItem, with signals blocked
+        # so currentIndexChanged doesn't fan out N times during the rebuild
+        cmb.blockSignals(True)
+        cmb.clear()
+        cmb.addItems([name for _, name in rows])
+        for i, (cid, _) in enumerate(rows):
+            cmb.setItemData(i, cid)
+        cmb.blockSignals(False)
+
+    def load_data(self):
+        cid = self.cmb_farmer.currentData()
+        if cid is None:
+            return
+        d1 = self.d_from.date().toString('yyyy-MM-dd')
+        d2 = self.d_to.date().toString('yyyy-MM-dd')
+        sql = (
+            "SELECT s.supply_date, s.crop, s.start_time, s.end_time, "
+            "s.hours, s.amount, s.notes, "
+            "SUM(s.amount) OVER () AS grand_total "
+            "FROM supplies s WHERE s.customer_id=? AND s.supply_date BETWEEN ? AND ? "
+            "ORDER BY s.supply_date ASC, s.id ASC"
+        )
+        q = QSqlQuery()
+        q.prepare(sql)
+        q.addBindValue(cid)
+        q.addBindValue(d1)
+        q.addBindValue(d2)
+        q.exec_()
+        self.model.setQuery(q)
+        self._last_sql = sql
+        self._last_binds = [cid, d1, d2]
+        # New rows invalidate the cached invoice document
+        self._doc = None
+        headers = ["Date", "Crop", "Start", "Off", "Hours", "Amount", "Notes"]
+        for i, h in enumerate(headers):
+            self.model.setHeaderData(i, Qt.Horizontal, h)
+        # Grand total comes back as a hidden window-function column instead
+        # of a second SUM query over the same rows
+        self.view.setColumnHidden(7, True)
+        total = self.model.record(0).value('grand_total') if self.model.rowCount() else 0.0
+        self.lbl_total.setText(f"Total Amount: ₹{float(total or 0):.2f}")
+        
+        # Update button states
+        self.update_button_states()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Invoice Data", f"invoice_{QDateTime.currentDateTime().toString('yyyyMMdd_HHmm')}", "CSV (*.csv);;Excel (*.xlsx)")
+        if not path:
+            return
+        # Exclude the hidden grand_total column from the export
+        cc = self.model.columnCount() - 1
+        headers = [self.model.headerData(i, Qt.Horizontal) for i in range(cc)]
+        rows = fetch_query_rows(self._last_sql, self._last_binds) if self._last_sql else []
+        run_export_in_background(self, headers, [row[:cc] for row in rows], path)
+
+    def invoice_html(self):
+        """Generate HTML for invoice printing"""
+        # Reuse the filter values captured at load time instead of another
+        # round of widget reads; the invoice must match the loaded rows anyway
+        if self._last_binds:
+            cid, d1, d2 = self._last_binds
+            farmer = farmer_cache.by_id.get(cid, self.cmb_farmer.currentText())
+        else:
+            farmer = self.cmb_farmer.currentText()
+            d1 = self.d_from.date().toString('yyyy-MM-dd')
+            d2 = self.d_to.date().toString('yyyy-MM-dd')
+
+        data_rows = fetch_query_rows(self._last_sql, self._last_binds) if self._last_sql else []
+        # The grand total rides along on every row as the window-function
+        # column, so no Python-side accumulation is needed
+        total = float(data_rows[0][-1] or 0) if data_rows else 0.0
+
+        # Check if we have data
+        if not data_rows:
+            rows_html = """
+                <tr>
+                    <td colspan="8" style="text-align: center; padding: 20px; color: #666;">
+                        No records found for the selected period
+                    </td>
+                </tr>
+            """
+        else:
+            parts = []
+            esc = safe_html_value
+            currency = format_currency
+            fmt_date = format_date_for_display
+            for dt, crop, st, et, hrs, amt, notes, _grand_total in data_rows:
+                amt_val = float(amt or 0)
+                # Split the raw hours REAL here instead of CASTing per row in SQL
+                h, m = divmod(int(round(float(hrs or 0) * 60)), 60)
+                parts.append(
+                    f"""
+                        <tr>
+                            <td>{fmt_date(dt)}</td>
+                            <td>{esc(crop)}</td>
+                            <td>{esc(st)}</td>
+                            <td>{esc(et)}</td>
+                            <td>{h}</td>
+                            <td>{m}</td>
+                            <td>{currency(amt_val)}</td>
+                            <td>{esc(notes)}</td>
+                        </tr>
+                    """
+                )
+            rows_html = "".join(parts)
+        
+        html = _INVOICE_TEMPLATE.format(
+            farmer=farmer,
+            d1=d1,
+            d2=d2,
+            rate=int(DEFAULT_RATE),
+            rows_html=rows_html,
+            total=format_currency(total),
+        )
         return html
 
     def print_invoice(self):
@@ -1570,8 +2072,9 @@ class BillingTab(QWidget):
             return
             
         try:
+            from PyQt5.QtPrintSupport import QPrinter, QPrintPreviewDialog
             printer = QPrinter(QPrinter.HighResolution)
-            
+
             # Set print settings with fallback
             try:
                 printer.setOrientation(QPrinter.Portrait)
@@ -1598,20 +2101,32 @@ class BillingTab(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Print Error", f"Failed to print invoice: {str(e)}")
 
-    def _render_preview(self, printer):
-        """Render the invoice for printing"""
-        try:
+    def _invoice_document(self):
+        """Build the invoice document once per loaded data set.
+
+        Preview dialogs emit paintRequested on every zoom/page change;
+        reusing the parsed QTextDocument skips re-running the HTML parser
+        each time. load_data drops the cache when the rows change.
+        """
+        if self._doc is None:
             from PyQt5.QtGui import QTextDocument
             doc = QTextDocument()
             doc.setHtml(self.invoice_html())
-            
+            self._doc = doc
+        return self._doc
+
+    def _render_preview(self, printer):
+        """Render the invoice for printing"""
+        try:
+            doc = self._invoice_document()
+
             # Set document properties for better printing
             try:
                 doc.setPageSize(printer.pageRect().size())
             except AttributeError:
                 # Fallback for older PyQt5 versions
                 pass
-                
+
             doc.print_(printer)
         except Exception as e:
             QMessageBox.critical(self, "Print Error", f"Failed to render invoice: {str(e)}")
@@ -1623,6 +2138,7 @@ class BillingTab(QWidget):
             return
             
         try:
+            from PyQt5.QtPrintSupport import QPrinter, QPrintPreviewDialog
             printer = QPrinter()
             printer.setResolution(300)  # High resolution
             
@@ -1636,37 +2152,38 @@ class BillingTab(QWidget):
     def _render_preview_simple(self, printer):
         """Simple render method for printing"""
         try:
-            from PyQt5.QtGui import QTextDocument
-            doc = QTextDocument()
-            doc.setHtml(self.invoice_html())
-            doc.print_(printer)
+            self._invoice_document().print_(printer)
         except Exception as e:
             QMessageBox.critical(self, "Print Error", f"Failed to render invoice: {str(e)}")
 
     def update_button_states(self):
         """Update button states based on data availability"""
-        has_data = self.model.rowCount() > 0
-        has_farmer = self.cmb_farmer.currentData() is not None
-        
-        # Find the print button in the layout
-        for i in range(self.layout().count()):
-            widget = self.layout().itemAt(i).widget()
-            if isinstance(widget, QGroupBox):
-                group_layout = widget.layout()
-                if group_layout:
-                    for j in range(group_layout.count()):
-                        item = group_layout.itemAt(j)
-                        if item and item.widget():
-                            btn = item.widget()
-                            if isinstance(btn, QPushButton) and "Print" in btn.text():
-                                btn.setEnabled(has_data and has_farmer)
-                                break
+        enabled = self.model.rowCount() > 0 and self.cmb_farmer.currentData() is not None
+        self.btn_print.setEnabled(enabled)
+        self.btn_export.setEnabled(enabled)
 
 # ---------- Main Window ----------
 class MainWindow(QMainWindow):
     def __init__(self, on_logout=None):
         super().__init__()
         self.on_logout = on_logout
+        # One QSettings backend handle plus an in-memory cache, so toggles
+        # don't re-open the INI/registry store on every click
+        self._settings = QSettings("WaterSupplyApp", "Preferences")
+        self._settings_cache = {}
+        self._current_theme = None
+        # Backend writes are debounced: rapid toggling stages values here and
+        # only the final state is flushed once input pauses
+        self._pending_settings = {}
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(200)
+        self._flush_timer.timeout.connect(self._flush_settings)
+        # Reused dialog instances, built on first show
+        self._about_box = None
+        self._logout_box = None
+        # Set by the logout path so closeEvent doesn't quit the app
+        self._logging_out = False
         self.setup_window()
         self.setup_tabs()
         self.setup_toolbar()
@@ -1676,6 +2193,8 @@ class MainWindow(QMainWindow):
         """Setup main window properties"""
         self.setWindowTitle(f"{APP_NAME}")
         self.setMinimumSize(1100, 700)
+        # Transient warnings go here instead of through modal dialogs
+        self.setStatusBar(QStatusBar(self))
         # Set the application icon
         try:
             self.setWindowIcon(QIcon("sewage-plant.png"))
@@ -1687,19 +2206,47 @@ class MainWindow(QMainWindow):
                 pass
 
     def setup_tabs(self):
-        """Setup the tab widget"""
+        """Setup the tab widget; every tab starts as an empty placeholder.
+
+        Each tab runs its own queries and builds a full widget tree, so
+        none are built inside the constructor: the default Customers tab
+        is scheduled for the next event-loop tick (after the chrome has
+        painted) and the rest materialize on first visit.
+        """
         self.tabs = QTabWidget()
-        self.tab_customers = CustomersTab()
-        self.tab_supply = SupplyTab()
-        self.tab_reports = ReportsTab()
-        self.tab_billing = BillingTab()
-        
-        self.tabs.addTab(self.tab_customers, "Customers")
-        self.tabs.addTab(self.tab_supply, "Water Supply")
-        self.tabs.addTab(self.tab_reports, "Reports")
-        self.tabs.addTab(self.tab_billing, "Billing / Invoices")
-        
+        self.tab_customers = None
+        self.tab_supply = None
+        self.tab_reports = None
+        self.tab_billing = None
+
+        self._pending_tabs = {
+            0: ("tab_customers", CustomersTab, "Customers"),
+            1: ("tab_supply", SupplyTab, "Water Supply"),
+            2: ("tab_reports", ReportsTab, "Reports"),
+            3: ("tab_billing", BillingTab, "Billing / Invoices"),
+        }
+        for idx in sorted(self._pending_tabs):
+            self.tabs.addTab(QWidget(), self._pending_tabs[idx][2])
+        self.tabs.currentChanged.connect(self._materialize_tab)
+
         self.setCentralWidget(self.tabs)
+        # Stage 2: build the default tab once the window skeleton is up
+        QTimer.singleShot(0, lambda: self._materialize_tab(0))
+
+    def _materialize_tab(self, idx):
+        """Swap a placeholder for the real tab on first show"""
+        pending = self._pending_tabs.pop(idx, None)
+        if pending is None:
+            return
+        attr, factory, title = pending
+        tab = factory()
+        setattr(self, attr, tab)
+        self.tabs.removeTab(idx)
+        self.tabs.insertTab(idx, tab, title)
+        self.tabs.setCurrentIndex(idx)
+        if attr == "tab_supply":
+            # The saved time format could not be applied before the tab existed
+            self.load_time_settings()
 
 
 
@@ -1709,149 +2256,272 @@ class MainWindow(QMainWindow):
         tb.setMovable(False)
         self.addToolBar(Qt.TopToolBarArea, tb)
 
-        # Create buttons with enhanced styling
-        btn_about = QPushButton("About")
-        btn_about.setToolTip("Show application information and features")
-        
-        btn_refresh = QPushButton("Reload Farmers")
-        btn_refresh.setToolTip("Refresh farmer list in all tabs")
-        
-        btn_dark = QPushButton("Dark Mode")
-        btn_dark.setCheckable(True)
-        btn_dark.setToolTip("Toggle between dark and light themes")
-        
-        btn_time_format = QPushButton("12H Format")
-        btn_time_format.setCheckable(True)
-        btn_time_format.setToolTip("Toggle between 12-hour and 24-hour time format")
-        
-        btn_logout = QPushButton("Logout")
-        btn_logout.setToolTip("Logout and return to login screen")
-
-        # Connect signals
-        btn_about.clicked.connect(self.show_about)
-        btn_refresh.clicked.connect(self.reload_farmers_everywhere)
-        btn_dark.toggled.connect(self.toggle_dark_mode)
-        btn_time_format.toggled.connect(self.toggle_time_format)
-        btn_logout.clicked.connect(self.do_logout)
-
-        # Add to toolbar
-        for btn in (btn_about, btn_refresh, btn_dark, btn_time_format, btn_logout):
-            tb.addWidget(btn)
-            
-        # Store button references
-        self.btn_dark = btn_dark
-        self.btn_time_format = btn_time_format
+        # QActions are lighter than full QPushButton widgets: no per-widget
+        # construction, layout, or style polish for each toolbar entry
+        act_about = tb.addAction("About")
+        act_about.setToolTip("Show application information and features")
+
+        act_refresh = tb.addAction("Reload Farmers")
+        act_refresh.setToolTip("Refresh farmer list in all tabs")
+
+        act_dark = tb.addAction("Dark Mode")
+        act_dark.setCheckable(True)
+        act_dark.setToolTip("Toggle between dark and light themes")
+
+        act_time_format = tb.addAction("12H Format")
+        act_time_format.setCheckable(True)
+        act_time_format.setToolTip("Toggle between 12-hour and 24-hour time format")
+
+        act_logout = tb.addAction("Logout")
+        act_logout.setToolTip("Logout and return to login screen")
+
+        # Connect signals; these are always same-thread, so a direct
+        # connection skips the AutoConnection thread-affinity check per emit
+        act_about.triggered.connect(self.show_about, Qt.DirectConnection)
+        act_refresh.triggered.connect(self.reload_farmers_everywhere, Qt.DirectConnection)
+        act_dark.toggled.connect(self.toggle_dark_mode, Qt.DirectConnection)
+        act_time_format.toggled.connect(self.toggle_time_format, Qt.DirectConnection)
+        act_logout.triggered.connect(self.do_logout, Qt.DirectConnection)
+
+        # Store action references
+        self.act_dark = act_dark
+        self.act_time_format = act_time_format
+
+    def _get_setting(self, key, default, type_):
+        """Read a preference through the in-memory cache"""
+        cache = self._settings_cache
+        if key not in cache:
+            cache[key] = self._settings.value(key, default, type=type_)
+        return cache[key]
+
+    def _set_setting(self, key, value):
+        """Stage a changed preference; the flush timer persists it later"""
+        if self._settings_cache.get(key) != value:
+            self._settings_cache[key] = value
+            self._pending_settings[key] = value
+            self._flush_timer.start()
+
+    def _flush_settings(self):
+        """Write all staged preference changes to the backend in one pass"""
+        pending = self._pending_settings
+        if pending:
+            set_value = self._settings.setValue
+            for key, value in pending.items():
+                set_value(key, value)
+            pending.clear()
+
+    def closeEvent(self, event):
+        """Persist anything still inside the debounce window before closing"""
+        self._flush_timer.stop()
+        self._flush_settings()
+        super().closeEvent(event)
+        # Quit-on-last-window-closed is off so the login/main handoff can be
+        # briefly windowless; closing the main window must quit explicitly,
+        # unless a logout is about to reopen the login dialog
+        if not self._logging_out:
+            QApplication.instance().quit()
 
     def toggle_time_format(self, enabled):
         """Toggle between 12-hour and 24-hour time format"""
         self.time_format_12h = enabled
-        settings = QSettings("WaterSupplyApp", "Preferences")
-        settings.setValue("timeformat12h", enabled)
+        self._set_setting("timeformat12h", enabled)
 
         fmt = "hh:mm AP" if enabled else "HH:mm"
-        self.tab_supply.t_start.setDisplayFormat(fmt)
-        self.tab_supply.t_end.setDisplayFormat(fmt)
-        self.tab_supply.auto_calc()
+        supply = self.tab_supply
+        if supply is None:  # Applied by _materialize_tab on first show
+            return
+        # Spurious toggles would otherwise repaint both time edits and
+        # recompute hours for a format that is already in effect
+        if supply.t_start.displayFormat() == fmt:
+            return
+        supply.t_start.setDisplayFormat(fmt)
+        supply.t_end.setDisplayFormat(fmt)
+        supply.auto_calc()
 
     def load_time_settings(self):
         """Load time format settings"""
-        settings = QSettings("WaterSupplyApp", "Preferences")
-        self.time_format_12h = settings.value("timeformat12h", False, type=bool)
-        self.btn_time_format.setChecked(self.time_format_12h)
+        self.time_format_12h = self._get_setting("timeformat12h", False, bool)
+        # Blocked so the programmatic check doesn't re-enter toggle_time_format
+        with QSignalBlocker(self.act_time_format):
+            self.act_time_format.setChecked(self.time_format_12h)
         fmt = "hh:mm AP" if self.time_format_12h else "HH:mm"
-        self.tab_supply.t_start.setDisplayFormat(fmt)
-        self.tab_supply.t_end.setDisplayFormat(fmt)
+        supply = self.tab_supply
+        if supply is None:  # Applied by _materialize_tab on first show
+            return
+        if supply.t_start.displayFormat() != fmt:
+            supply.t_start.setDisplayFormat(fmt)
+            supply.t_end.setDisplayFormat(fmt)
 
     def load_settings(self):
         """Load application settings"""
-        settings = QSettings("WaterSupplyApp", "Preferences")
-        if settings.value("darkmode", False, type=bool):
-            self.btn_dark.setChecked(True)
+        dark = self._get_setting("darkmode", False, bool)
+        self._current_theme = 'dark' if dark else 'light'
+        # Stamp this freshly built window; already-correct windows are
+        # skipped, so no widget tree gets repolished twice
+        apply_app_theme(dark)
+        if dark:
+            # Exception-safe variant of the blockSignals(True/False) pair
+            with QSignalBlocker(self.act_dark):
+                self.act_dark.setChecked(True)
         
         # Load time format settings
         self.load_time_settings()
 
     def toggle_dark_mode(self, enabled: bool):
         """Toggle dark mode"""
-        settings = QSettings("WaterSupplyApp", "Preferences")
-        settings.setValue("darkmode", enabled)
-        QApplication.instance().setStyleSheet(dark_stylesheet if enabled else light_stylesheet)
+        theme = 'dark' if enabled else 'light'
+        # Redundant toggles (settings reload, programmatic setChecked) would
+        # otherwise re-polish every widget in the tree for no visible change
+        if theme == self._current_theme:
+            return
+        self._current_theme = theme
+        self._set_setting("darkmode", enabled)
+        # Keep the app-level snapshot current so a logout re-stamps the next
+        # login dialog with the active theme, not the startup one
+        _app_state["dark_pref"] = enabled
+        apply_app_theme(enabled)
 
     def reload_farmers_everywhere(self):
-        """Reload farmers in all tabs"""
+        """Reload farmers in all tabs from a single DB snapshot"""
         try:
-            self.tab_supply.reload_customers()
-            self.tab_reports.reload_customers()
-            self.tab_billing.reload_customers()
+            # Refresh the shared snapshot now; the per-tab combo rebuilds are
+            # queued so paint events interleave and the click returns at once
+            farmer_cache.refresh()
+            # Unbuilt tabs read the refreshed cache when they materialize
+            for tab in (self.tab_supply, self.tab_reports, self.tab_billing):
+                if tab is not None:
+                    QMetaObject.invokeMethod(tab, "reload_customers", Qt.QueuedConnection)
         except Exception as e:
-            QMessageBox.warning(self, "Warning", f"Failed to reload farmers: {str(e)}")
+            # Non-blocking, unlike a modal warning box spinning its own loop
+            self.statusBar().showMessage(f"Failed to reload farmers: {str(e)}", 5000)
 
     def do_logout(self):
-        """Handle logout"""
-        reply = QMessageBox.question(
-            self, "Logout", "Do you want to logout?", 
-            QMessageBox.Yes | QMessageBox.No
-        )
-        if reply == QMessageBox.Yes and self.on_logout:
+        """Ask for logout confirmation without nesting an event loop"""
+        if self._logout_box is None:
+            mb = QMessageBox(
+                QMessageBox.Question, "Logout", "Do you want to logout?",
+                QMessageBox.Yes | QMessageBox.No, self
+            )
+            mb.finished.connect(self._logout_confirmed)
+            self._logout_box = mb
+        # open() shows the dialog asynchronously; QMessageBox.question would
+        # spin a nested exec_ loop and block the main one
+        self._logout_box.open()
+
+    def _logout_confirmed(self, result):
+        if result == QMessageBox.Yes and self.on_logout:
             self.on_logout()
 
     def show_about(self):
         """Show about dialog"""
-        about_text = f"""
-        <h2>{APP_NAME}</h2>
-        <p><strong>Version:</strong> {VERSION}</p>
-        <p><strong>Water Rate:</strong> ₹{int(DEFAULT_RATE)}/hour</p>
-        <p><strong>Contact:</strong> {CONTACT}</p>
-        <hr>
-        """
-        QMessageBox.information(self, "About", about_text)
+        if self._about_box is None:
+            self._about_box = QMessageBox(
+                QMessageBox.Information, "About", _ABOUT_HTML,
+                QMessageBox.Ok, self
+            )
+        self._about_box.open()
 
 
 # ---------- App Entry ----------
+class DBBootWorker(QThread):
+    """Runs the database bootstrap off the GUI thread during startup"""
+    ready = pyqtSignal(bool)
+    error = pyqtSignal(str)
+
+    def run(self):
+        # An exception escaping run() would die silently in the worker
+        # thread and leave the app waiting on db_ready forever
+        try:
+            self.ready.emit(ensure_database())
+        except Exception as e:
+            self.error.emit(str(e))
+
+# Startup/handoff state shared by the module-level app functions below; a
+# plain dict instead of closures, so re-logins allocate no new cells and no
+# reference cycle forms between MainWindow.on_logout and an enclosing frame
+_app_state = {
+    "app": None, "main": None, "dlg": None, "boot": None,
+    "dark_pref": False, "db_ready": False, "login_ok": False, "fresh": False,
+}
+
+def _maybe_start_main():
+    state = _app_state
+    if state["db_ready"] and state["login_ok"]:
+        state["login_ok"] = False  # consumed; set again on re-login
+        _start_main()
+
+def _on_db_ready(fresh):
+    # Cross-thread signal, so this runs back on the GUI thread — the right
+    # place to open the Qt-side connection
+    open_qt_db()
+    _app_state["fresh"] = fresh
+    _app_state["db_ready"] = True
+    _maybe_start_main()
+
+def _on_db_error(msg):
+    # Matches the fatal-error path at the bottom of run_app: tell the user
+    # why startup failed instead of soft-locking with no window
+    QMessageBox.critical(None, "Fatal Error", f"Application failed to start: {msg}")
+    _app_state["app"].exit(1)
+
+def _on_login_accepted():
+    _app_state["login_ok"] = True
+    _maybe_start_main()
+
+def _logout_then_show_login():
+    main = _app_state["main"]
+    main._logging_out = True
+    main.close()
+    _show_login()
+
+def _start_main():
+    """Start the main application window"""
+    state = _app_state
+    main = state["main"] = MainWindow(on_logout=_logout_then_show_login)
+    main.show()
+
+    if state["fresh"]:
+        state["fresh"] = False
+        QMessageBox.information(
+            main, "Welcome",
+            f"Default login created:\nUsername: admin\nPassword: admin"
+        )
+
+def _show_login():
+    """Show the login dialog inside the single application loop"""
+    dlg = _app_state["dlg"] = LoginDialog()
+    apply_app_theme(_app_state["dark_pref"])  # stamp the new window's theme
+    # show() + signals instead of exec_(), so only app.exec_() in run_app
+    # ever spins an event loop
+    dlg.accepted.connect(_on_login_accepted)
+    dlg.rejected.connect(_app_state["app"].quit)
+    dlg.show()
+
 def run_app():
     """Main application entry point"""
     try:
-        app = QApplication(sys.argv)
-        
-        # Load settings and apply theme
+        app = _app_state["app"] = QApplication(sys.argv)
+        # The accepted login dialog can close before the DB bootstrap
+        # finishes, leaving no window up for a moment; quitting is explicit
+        # (login rejected, main window closed, fatal error) instead
+        app.setQuitOnLastWindowClosed(False)
+
+        # Parse the combined light+dark stylesheet exactly once; windows are
+        # themed afterwards by property stamping
+        install_app_stylesheet()
         settings = QSettings("WaterSupplyApp", "Preferences")
-        if settings.value("darkmode", False, type=bool):
-            app.setStyleSheet(dark_stylesheet)
-        else:
-            app.setStyleSheet(light_stylesheet)
-        
-        # Initialize database
-        fresh = ensure_database()
-        open_qt_db()
-
-        def start_main():
-            """Start the main application window"""
-            def logout_then_show_login():
-                main.close()
-                show_login()
-
-            nonlocal main
-            main = MainWindow(on_logout=logout_then_show_login)
-            main.show()
-            
-            if fresh:
-                QMessageBox.information(
-                    main, "Welcome", 
-                    f"Default login created:\nUsername: admin\nPassword: admin"
-                )
+        _app_state["dark_pref"] = settings.value("darkmode", False, type=bool)
 
-        def show_login():
-            """Show login dialog"""
-            dlg = LoginDialog()
-            if dlg.exec_() == QDialog.Accepted:
-                start_main()
-            else:
-                sys.exit(0)
+        # Bootstrap the database on a worker thread so the login dialog
+        # paints immediately; the main window waits for both login and DB
+        boot = _app_state["boot"] = DBBootWorker()
+        boot.ready.connect(_on_db_ready)
+        boot.error.connect(_on_db_error)
+        boot.start()
 
-        main = None
-        show_login()
+        _show_login()
         sys.exit(app.exec_())
-        
+
     except Exception as e:
         QMessageBox.critical(None, "Fatal Error", f"Application failed to start: {str(e)}")
         sys.exit(1)